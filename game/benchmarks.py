@@ -0,0 +1,333 @@
+"""Micro-benchmarks for the quiz hot paths.
+
+Runs offline: the CrewAI crew is replaced by a stub that returns canned
+question payloads, and the database lives in memory instead of Streamlit's
+session state.
+
+    python game/benchmarks.py                          # run and print
+    python game/benchmarks.py --save baseline.json     # store a baseline
+    python game/benchmarks.py --compare baseline.json  # fail on regressions
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from database_manager import DatabaseManager
+from question_bank import QuestionBank
+
+PAYLOAD_SIZES = [20, 200, 2000]
+POOL_SIZES = [100, 1000, 10000]
+LEADERBOARD_SIZES = [1000, 100000, 1000000]
+SAMPLE_POOL_SIZES = [20, 200, 2000]
+
+
+class StubCrew:
+    """Stands in for the CrewAI crew and returns a fixed kickoff result"""
+
+    def __init__(self, output=""):
+        self.tasks = []
+        self.output = output
+
+    def kickoff(self):
+        return self.output
+
+
+class MemoryDatabaseManager(DatabaseManager):
+    """DatabaseManager that keeps its data in memory instead of session state"""
+
+    def initialize_db(self):
+        self._data = self._empty_database()
+
+    def load_data(self):
+        return self._data
+
+    def save_data(self, data):
+        self._data = data
+
+
+def make_question(i, difficulty=5):
+    return {
+        "question": f"Question number {i}?",
+        "difficulty": str(difficulty),
+        "options": [f"Answer {i}", f"Wrong {i}a", f"Wrong {i}b", f"Wrong {i}c"],
+        "correct_answer": f"Answer {i}",
+        "explanation": f"Answer {i} is correct because it is number {i}.",
+        "concept": f"Concept {i % 10}"
+    }
+
+
+def make_payload(count, start=0):
+    """Build crew output the way the model returns it, wrapped in a markdown fence"""
+    questions = [make_question(i) for i in range(start, start + count)]
+    return "```json\n" + json.dumps({"questions": questions}, indent=2) + "\n```"
+
+
+def measure(func, repeat, setup=None):
+    """Time func() `repeat` times, running setup() untimed before each call"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings)
+    }
+
+
+def bench_extract_json(qb, repeat):
+    for size in PAYLOAD_SIZES:
+        def run(size=size):
+            payload = make_payload(size)
+            return measure(lambda: qb._extract_json(payload), repeat)
+        yield f"extract_json[n={size}]", run
+
+
+def bench_validate_question_set(qb, repeat):
+    for size in PAYLOAD_SIZES:
+        def run(size=size):
+            data = qb._extract_json(make_payload(size))
+            return measure(lambda: qb._validate_question_set(data), repeat)
+        yield f"validate_question_set[n={size}]", run
+
+
+def bench_ensure_questions_exist(qb, repeat):
+    subject = "Physics"
+    for size in POOL_SIZES:
+        def run(size=size):
+            pool = [make_question(i) for i in range(size)]
+            qb.crew = StubCrew(make_payload(20, start=size))
+            return measure(
+                lambda: qb.ensure_questions_exist(subject, 1, count=size + 1),
+                repeat,
+                setup=lambda: qb._save_questions(pool, subject, 1)
+            )
+        yield f"ensure_questions_exist[pool={size}]", run
+
+
+def bench_dedup_questions(qb, repeat):
+    for size in POOL_SIZES:
+        def run(size=size):
+            pool = [make_question(i) for i in range(size)]
+            new_questions = [make_question(i) for i in range(size, size + 20)]
+            questions = None
+
+            def setup():
+                nonlocal questions
+                questions = list(pool)
+            return measure(lambda: qb._add_unique_questions(questions, new_questions), repeat, setup)
+        yield f"dedup_questions[pool={size}]", run
+
+
+def bench_question_file_io(qb, repeat):
+    subject = "Physics"
+    for size in POOL_SIZES:
+        def run(size=size):
+            pool = [make_question(i) for i in range(size)]
+
+            def round_trip():
+                qb._save_questions(pool, subject, 1)
+                qb._load_questions(subject, 1)
+            return measure(round_trip, repeat)
+        yield f"question_file_io[pool={size}]", run
+
+
+def bench_update_user_score(qb, repeat):
+    subject = "Mathematics"
+    level_name = DatabaseManager.DIFFICULTY_LEVELS[3]
+    for size in LEADERBOARD_SIZES:
+        def run(size=size):
+            db = MemoryDatabaseManager("benchmark.json")
+            data = db.load_data()
+            data["leaderboard"][subject][level_name] = [
+                {"user_id": f"user-{i}", "name": f"Player {i}", "score": 100 * (size - i) // size}
+                for i in range(size)
+            ]
+            db.rebuild_aggregates()
+            db.add_user("user-bench", "Bench Player")
+            scores = iter(random.Random(size).choices(range(101), k=repeat))
+            return measure(lambda: db.update_user_score("user-bench", subject, 3, next(scores)), repeat)
+        yield f"update_user_score[leaderboard={size}]", run
+
+
+def bench_submit_score_reruns(qb, repeat):
+    subject = "Mathematics"
+    level_name = DatabaseManager.DIFFICULTY_LEVELS[3]
+    reruns = 20
+    for size in LEADERBOARD_SIZES[:2]:
+        def run(size=size):
+            leaderboard = [
+                {"user_id": f"user-{i}", "name": f"Player {i}", "score": 100 * (size - i) // size}
+                for i in range(size)
+            ]
+            db = None
+
+            def setup():
+                nonlocal db
+                db = MemoryDatabaseManager("benchmark.json")
+                db.load_data()["leaderboard"][subject][level_name] = list(leaderboard)
+                db.rebuild_aggregates()
+
+            def show_results():
+                # One session rerunning its results page
+                for _ in range(reruns):
+                    db.submit_score("student", "Student", subject, 3, 80)
+                    db.get_leaderboard(subject, level_name)
+            return measure(show_results, repeat, setup)
+        yield f"submit_score_reruns[reruns={reruns},leaderboard={size}]", run
+
+
+def bench_get_top_players(qb, repeat):
+    level_name = DatabaseManager.DIFFICULTY_LEVELS[2]
+    for size in LEADERBOARD_SIZES:
+        def run(size=size):
+            db = MemoryDatabaseManager("benchmark.json")
+            data = db.load_data()
+            data["leaderboard"]["Economics"][level_name] = [
+                {"user_id": f"user-{i}", "name": f"Player {i}", "score": 100 * (size - i) // size}
+                for i in range(size)
+            ]
+            db.rebuild_aggregates()
+            return measure(lambda: db.get_top_players(10), repeat)
+        yield f"get_top_players[players={size}]", run
+
+
+def bench_get_main_questions(qb, repeat):
+    subject = "History"
+    for size in SAMPLE_POOL_SIZES:
+        def run(size=size):
+            qb._save_questions([make_question(i) for i in range(size)], subject, 2)
+            return measure(lambda: qb.get_main_questions(subject, 2), repeat)
+        yield f"get_main_questions[pool={size}]", run
+
+
+BENCHMARKS = [
+    bench_extract_json,
+    bench_validate_question_set,
+    bench_ensure_questions_exist,
+    bench_dedup_questions,
+    bench_question_file_io,
+    bench_update_user_score,
+    bench_submit_score_reruns,
+    bench_get_top_players,
+    bench_get_main_questions,
+]
+
+
+def run_benchmarks(repeat=5, name_filter=None):
+    """Run every benchmark whose name contains name_filter and return the results"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                qb = QuestionBank()
+            qb.crew = StubCrew()
+            qb.questions_dir = Path(tmp_dir)
+            for bench in BENCHMARKS:
+                for name, run in bench(qb, repeat):
+                    if name_filter and name_filter not in name:
+                        continue
+                    result = results[name] = run()
+                    print(f"{name:<55}{result['median'] * 1000:>12.3f} ms")
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def compare_results(baseline, current, threshold, floor=0.0):
+    """Return the names of benchmarks whose median regressed by more than threshold,
+    and the names that are in the baseline but missing from the current run.
+
+    Slowdowns smaller than floor seconds are treated as timer noise.
+    """
+    regressions = []
+    width = max([len("Benchmark")] + [len(name) for name in {**baseline, **current}]) + 2
+    print(f"\n{'Benchmark':<{width}}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    print("-" * (width + 34))
+    for name, result in current.items():
+        if name not in baseline:
+            print(f"{name:<{width}}{'-':>12}{result['median'] * 1000:>10.3f}ms{'new':>10}")
+            continue
+        before = baseline[name]["median"]
+        after = result["median"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > floor:
+            regressions.append(name)
+            flag = " !"
+        print(f"{name:<{width}}{before * 1000:>10.3f}ms{after * 1000:>10.3f}ms{change:>+9.1%}{flag}")
+
+    missing = [name for name in baseline if name not in current]
+    for name in missing:
+        print(f"{name:<{width}}{baseline[name]['median'] * 1000:>10.3f}ms{'-':>12}{'missing':>10}")
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quiz hot paths")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="compare against a JSON baseline saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown of the median counted as a regression")
+    parser.add_argument("--floor", type=float, default=0.05,
+                        help="ignore slowdowns of the median smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    # The crew is stubbed, but creating the agent still expects a key to be set
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    results = run_benchmarks(args.repeat, args.filter)
+
+    if args.save:
+        report = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat
+            },
+            "results": results
+        }
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)["results"]
+        if args.filter:
+            baseline = {name: result for name, result in baseline.items() if args.filter in name}
+        regressions, missing = compare_results(baseline, results, args.threshold, args.floor / 1000)
+        # A renamed or removed benchmark would otherwise pass unnoticed
+        failed = bool(regressions) or (bool(missing) and not args.filter)
+        if missing:
+            print(f"\n× {len(missing)} benchmark(s) in the baseline did not run")
+        if regressions:
+            print(f"\n× {len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.threshold:.0%} and {args.floor} ms")
+        if failed:
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 import os
 import streamlit as st
@@ -14,27 +15,44 @@ class DatabaseManager:
 
     def __init__(self, db_file):
         self.db_file = db_file
+        self._written = {}
         self.initialize_db()
 
     def initialize_db(self):
         # Use Streamlit's session state for persistence
         if 'database' not in st.session_state:
-            initial_data = {
-                "users": {},
-                "leaderboard": {
-                    "History": {},
-                    "Physics": {},
-                    "Mathematics": {},
-                    "Economics": {},
-                    "English": {}
-                }
+            st.session_state.database = self._empty_database()
+        elif "aggregates" not in st.session_state.database:
+            self.rebuild_aggregates()
+
+    def _empty_database(self):
+        initial_data = {
+            "users": {},
+            "leaderboard": {
+                "History": {},
+                "Physics": {},
+                "Mathematics": {},
+                "Economics": {},
+                "English": {}
             }
-            # Initialize leaderboard with new difficulty levels
-            for subject in initial_data["leaderboard"]:
-                for level in self.DIFFICULTY_LEVELS.values():
-                    initial_data["leaderboard"][subject][level] = []
-            
-            st.session_state.database = initial_data
+        }
+        # Initialize leaderboard with new difficulty levels
+        for subject in initial_data["leaderboard"]:
+            for level in self.DIFFICULTY_LEVELS.values():
+                initial_data["leaderboard"][subject][level] = []
+        
+        initial_data["aggregates"] = self._empty_aggregates(initial_data["leaderboard"])
+        return initial_data
+
+    def _empty_aggregates(self, leaderboard):
+        # Materialized rankings over the per (subject, level) leaderboards.
+        # Each one keeps a user's total score in "totals" and a ranking list
+        # sorted by that total, highest first.
+        return {
+            "global": {"totals": {}, "ranking": []},
+            "subject": {subject: {"totals": {}, "ranking": []} for subject in leaderboard},
+            "level": {level: {"totals": {}, "ranking": []} for level in self.DIFFICULTY_LEVELS.values()}
+        }
 
     def load_data(self):
         return st.session_state.database
@@ -43,7 +61,13 @@ class DatabaseManager:
         st.session_state.database = data
 
     def add_user(self, user_id, name):
+        self._forget_written()
         data = self.load_data()
+        if self._add_user(data, user_id, name):
+            self.save_data(data)
+
+    def _add_user(self, data, user_id, name):
+        """Create or rename a user in data, returning whether anything changed"""
         # Only create new user entry if user doesn't exist
         if user_id not in data["users"]:
             data["users"][user_id] = {
@@ -52,44 +76,255 @@ class DatabaseManager:
                 "grades": {},
                 "scores": {}
             }
-            self.save_data(data)
+            return True
         # Update name if user exists but name is different
-        elif data["users"][user_id]["name"] != name:
+        if data["users"][user_id]["name"] != name:
             data["users"][user_id]["name"] = name
-            self.save_data(data)
+            # Aggregate rankings show the current name, unlike the per level snapshots
+            for aggregate in self._iter_aggregates(data["aggregates"]):
+                index = self._find_aggregate_entry(aggregate, user_id)
+                if index is not None:
+                    aggregate["ranking"][index]["name"] = name
+            return True
+        return False
 
     def update_user_score(self, user_id, subject, difficulty_level, score):
+        self._forget_written()
         data = self.load_data()
-        user_data = data["users"][user_id]
-        
-        if subject not in user_data["subjects"]:
-            user_data["subjects"].append(subject)
+        name = data["users"][user_id]["name"]
+        self._apply_scores(data, [(user_id, name, subject, difficulty_level, score)])
+        self.save_data(data)
+
+    def _apply_scores(self, data, submissions):
+        """Apply (user_id, name, subject, difficulty_level, score) submissions to data"""
+        boards = {}
+        for user_id, name, subject, difficulty_level, score in submissions:
+            user_data = data["users"][user_id]
+            
+            if subject not in user_data["subjects"]:
+                user_data["subjects"].append(subject)
+            
+            level_name = self.DIFFICULTY_LEVELS[difficulty_level]
+            user_data["grades"][subject] = level_name
+            user_data["scores"][subject] = score
+            boards.setdefault((subject, level_name), {})[user_id] = (name, score)
+
+        aggregates = data["aggregates"]
+        for (subject, level_name), scores in boards.items():
+            # Update leaderboard
+            if level_name not in data["leaderboard"][subject]:
+                data["leaderboard"][subject][level_name] = []
+
+            # Remove previous entries if they exist
+            previous_scores = {}
+            leaderboard = []
+            for entry in data["leaderboard"][subject][level_name]:
+                if entry["user_id"] in scores:
+                    previous_scores[entry["user_id"]] = entry["score"]
+                else:
+                    leaderboard.append(entry)
+
+            for user_id, (name, score) in scores.items():
+                # Add new entry
+                leaderboard.append({
+                    "user_id": user_id,
+                    "name": name,
+                    "score": score
+                })
+
+                # Apply the score change to the aggregate leaderboards
+                delta = score - previous_scores.get(user_id, 0)
+                for aggregate in (
+                    aggregates["global"],
+                    aggregates["subject"].setdefault(subject, {"totals": {}, "ranking": []}),
+                    aggregates["level"].setdefault(level_name, {"totals": {}, "ranking": []})
+                ):
+                    self._apply_aggregate_delta(
+                        aggregate, user_id, data["users"][user_id]["name"], delta
+                    )
+
+            # Sort leaderboard
+            leaderboard.sort(
+                key=lambda x: x["score"], 
+                reverse=True
+            )
+            data["leaderboard"][subject][level_name] = leaderboard
+
+    def submit_score(self, user_id, name, subject, difficulty_level, score):
+        """Record a quiz result, skipping the write if it is already stored.
+
+        The results page calls this on every rerun, so an unchanged result
+        costs no load/save round trip. Unknown subjects and levels, and scores
+        that are not whole percentages, are rejected before anything changes.
+        """
+        data = self.load_data()
+        self._check_submission(data, subject, difficulty_level, score)
+        if self._written.get((user_id, subject)) == (difficulty_level, name, score):
+            # Already stored, e.g. the results page being rerun
+            return
+
+        self._add_user(data, user_id, name)
+        self._apply_scores(data, [(user_id, name, subject, difficulty_level, score)])
+        self.save_data(data)
+
+        # A rename means results remembered under the old name are no longer stored as is
+        self._written = {
+            key: value for key, value in self._written.items()
+            if key[0] != user_id or value[1] == name
+        }
+        self._written[(user_id, subject)] = (difficulty_level, name, score)
+
+    def _check_submission(self, data, subject, difficulty_level, score):
+        if subject not in data["leaderboard"]:
+            raise ValueError(f"Unknown subject: {subject}")
+        if difficulty_level not in self.DIFFICULTY_LEVELS:
+            raise ValueError(f"Unknown difficulty level: {difficulty_level}")
+        if not isinstance(score, int) or isinstance(score, bool) or not 0 <= score <= 100:
+            raise ValueError(f"Score must be a whole number from 0 to 100: {score!r}")
+
+    def _forget_written(self):
+        # A direct write may change what submit_score assumes is already stored
+        self._written = {}
+
+    def get_leaderboard(self, subject, level_name):
+        """Get the leaderboard for a subject and level"""
+        return self.load_data()["leaderboard"][subject].get(level_name, [])
+
+    def _find_aggregate_entry(self, aggregate, user_id):
+        """Get the index of a user's entry in an aggregate ranking, or None"""
+        if user_id not in aggregate["totals"]:
+            return None
+        # Only the entries tied on the user's total need to be scanned
+        ranking = aggregate["ranking"]
+        total = aggregate["totals"][user_id]
+        rank_key = lambda entry: -entry["score"]
+        start = bisect_left(ranking, -total, key=rank_key)
+        end = bisect_right(ranking, -total, key=rank_key)
+        for i in range(start, end):
+            if ranking[i]["user_id"] == user_id:
+                return i
+        return None
+
+    def _apply_aggregate_delta(self, aggregate, user_id, name, delta):
+        """Move a user's entry in an aggregate ranking by a score delta"""
+        totals = aggregate["totals"]
+        ranking = aggregate["ranking"]
+
+        index = self._find_aggregate_entry(aggregate, user_id)
+        if index is not None:
+            del ranking[index]
         
-        level_name = self.DIFFICULTY_LEVELS[difficulty_level]
-        user_data["grades"][subject] = level_name
-        user_data["scores"][subject] = score
-
-        # Update leaderboard
-        if level_name not in data["leaderboard"][subject]:
-            data["leaderboard"][subject][level_name] = []
-
-        # Remove previous entry if exists
-        data["leaderboard"][subject][level_name] = [
-            entry for entry in data["leaderboard"][subject][level_name]
-            if entry["user_id"] != user_id
-        ]
-
-        # Add new entry
-        data["leaderboard"][subject][level_name].append({
-            "user_id": user_id,
-            "name": user_data["name"],
-            "score": score
-        })
-
-        # Sort leaderboard
-        data["leaderboard"][subject][level_name].sort(
-            key=lambda x: x["score"], 
-            reverse=True
+        total = totals.get(user_id, 0) + delta
+        totals[user_id] = total
+        ranking.insert(
+            bisect_right(ranking, -total, key=lambda entry: -entry["score"]),
+            {"user_id": user_id, "name": name, "score": total}
         )
 
-        self.save_data(data) 
\ No newline at end of file
+    def get_top_players(self, k=10, subject=None, level_name=None):
+        """Get the top k players by total score.
+
+        With neither filter this is the global ranking; pass a subject to rank
+        across its levels, or a level name to rank across subjects.
+        """
+        data = self.load_data()
+        if subject is not None and level_name is not None:
+            return data["leaderboard"][subject].get(level_name, [])[:k]
+        if subject is not None:
+            aggregate = data["aggregates"]["subject"].get(subject)
+        elif level_name is not None:
+            aggregate = data["aggregates"]["level"].get(level_name)
+        else:
+            aggregate = data["aggregates"]["global"]
+        if aggregate is None:
+            return []
+        return aggregate["ranking"][:k]
+
+    def _compute_aggregates(self, data):
+        """Recompute the aggregate leaderboards from scratch from the base leaderboards"""
+        aggregates = self._empty_aggregates(data["leaderboard"])
+        names = {}
+        for subject, levels in data["leaderboard"].items():
+            for level_name, entries in levels.items():
+                for entry in entries:
+                    names[entry["user_id"]] = entry["name"]
+                for aggregate in (
+                    aggregates["global"],
+                    aggregates["subject"].setdefault(subject, {"totals": {}, "ranking": []}),
+                    aggregates["level"].setdefault(level_name, {"totals": {}, "ranking": []})
+                ):
+                    for entry in entries:
+                        aggregate["totals"][entry["user_id"]] = (
+                            aggregate["totals"].get(entry["user_id"], 0) + entry["score"]
+                        )
+
+        names.update((user_id, user["name"]) for user_id, user in data["users"].items())
+        for aggregate in self._iter_aggregates(aggregates):
+            aggregate["ranking"] = sorted(
+                (
+                    {"user_id": user_id, "name": names.get(user_id, ""), "score": total}
+                    for user_id, total in aggregate["totals"].items()
+                ),
+                key=lambda entry: entry["score"],
+                reverse=True
+            )
+        return aggregates
+
+    def _iter_aggregates(self, aggregates):
+        yield aggregates["global"]
+        yield from aggregates["subject"].values()
+        yield from aggregates["level"].values()
+
+    def rebuild_aggregates(self):
+        """Rebuild the aggregate leaderboards from the base leaderboards"""
+        data = self.load_data()
+        data["aggregates"] = self._compute_aggregates(data)
+        self.save_data(data)
+
+    def check_aggregates(self):
+        """Verify the aggregate leaderboards against the base leaderboards.
+
+        Returns a list of human readable problems; an empty list means the
+        aggregates are consistent.
+        """
+        data = self.load_data()
+        expected = self._compute_aggregates(data)
+        actual = data.get("aggregates")
+        if actual is None:
+            return ["aggregates are missing"]
+
+        problems = []
+        scopes = [("global", expected["global"], actual.get("global"))]
+        for kind in ("subject", "level"):
+            for key, aggregate in expected[kind].items():
+                scopes.append((f"{kind} {key}", aggregate, actual.get(kind, {}).get(key)))
+            for key in set(actual.get(kind, {})) - set(expected[kind]):
+                problems.append(f"{kind} {key}: unexpected aggregate")
+        for kind in set(actual) - set(expected):
+            problems.append(f"{kind}: unexpected aggregate")
+
+        for scope, wanted, found in scopes:
+            if found is None:
+                problems.append(f"{scope}: aggregate is missing")
+                continue
+            if found["totals"] != wanted["totals"]:
+                for user_id in set(wanted["totals"]) | set(found["totals"]):
+                    if wanted["totals"].get(user_id) != found["totals"].get(user_id):
+                        problems.append(
+                            f"{scope}: total for {user_id} is {found['totals'].get(user_id)}, "
+                            f"expected {wanted['totals'].get(user_id)}"
+                        )
+            ranked = {entry["user_id"]: entry["score"] for entry in found["ranking"]}
+            if len(found["ranking"]) != len(ranked) or ranked != found["totals"]:
+                problems.append(f"{scope}: ranking does not match totals")
+            names = {entry["user_id"]: entry["name"] for entry in wanted["ranking"]}
+            for entry in found["ranking"]:
+                if entry["user_id"] in names and entry["name"] != names[entry["user_id"]]:
+                    problems.append(
+                        f"{scope}: name for {entry['user_id']} is {entry['name']!r}, "
+                        f"expected {names[entry['user_id']]!r}"
+                    )
+            scores = [entry["score"] for entry in found["ranking"]]
+            if any(a < b for a, b in zip(scores, scores[1:])):
+                problems.append(f"{scope}: ranking is not sorted by score")
+        return problems 
\ No newline at end of file
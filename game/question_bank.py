@@ -109,13 +109,7 @@ class QuestionBank:
         
         try:
             result = str(self.crew.kickoff())
-            result = result.strip()
-            if '```json' in result:
-                result = result.split('```json')[1]
-            if '```' in result:
-                result = result.split('```')[0]
-            
-            data = json.loads(result.strip())
+            data = self._extract_json(result)
             if self._validate_question_set(data):
                 return data["questions"]
             
@@ -123,6 +117,16 @@ class QuestionBank:
             print(f"Error generating questions: {str(e)}")
             raise
 
+    def _extract_json(self, result: str) -> Dict:
+        """Extract the JSON payload from the crew output, stripping markdown fences"""
+        result = result.strip()
+        if '```json' in result:
+            result = result.split('```json')[1]
+        if '```' in result:
+            result = result.split('```')[0]
+        
+        return json.loads(result.strip())
+
     def _validate_question_set(self, data: Dict) -> bool:
         """Validate the generated question set"""
         if "questions" not in data or not isinstance(data["questions"], list):
@@ -153,9 +157,7 @@ class QuestionBank:
                     new_questions = self.generate_adaptive_quiz(subject, grade)
                     
                     # Filter out any duplicates
-                    for question in new_questions:
-                        if not any(self._is_similar_question(question, q) for q in questions):
-                            questions.append(question)
+                    self._add_unique_questions(questions, new_questions)
                     
                     self._save_questions(questions, subject, grade)
                     print(f"✓ Added {len(new_questions)} new questions! Total: {len(questions)}/{count}")
@@ -170,6 +172,12 @@ class QuestionBank:
         
         return questions
 
+    def _add_unique_questions(self, questions: List[Dict], new_questions: List[Dict]):
+        """Append the new questions that are not similar to any question already in the list"""
+        for question in new_questions:
+            if not any(self._is_similar_question(question, q) for q in questions):
+                questions.append(question)
+
     def _is_similar_question(self, q1: Dict, q2: Dict) -> bool:
         """Check if two questions are similar to avoid duplicates"""
         # Compare questions ignoring case and whitespace
@@ -27,7 +27,10 @@ if 'quiz_complete' not in st.session_state:
 
 # Initialize managers
 try:
-    db_manager = DatabaseManager('game_data.json')
+    # Keep the manager across reruns so it remembers which results are already stored
+    if 'db_manager' not in st.session_state:
+        st.session_state.db_manager = DatabaseManager('game_data.json')
+    db_manager = st.session_state.db_manager
     question_bank = QuestionBank()
     game_manager = GameManager(db_manager, question_bank)
 except Exception as e:
@@ -170,11 +173,8 @@ def display_results(subject, difficulty_level, name):
     else:
         difficulty_number = difficulty_level
     
-    # Ensure user exists in database before updating score
-    db_manager.add_user(st.session_state.user_id, name)
-    
-    # Update database
-    db_manager.update_user_score(st.session_state.user_id, subject, difficulty_number, final_score)
+    # Record the result; reruns of this page skip the write once it is stored
+    db_manager.submit_score(st.session_state.user_id, name, subject, difficulty_number, final_score)
     
     # Get difficulty level name
     level_name = DatabaseManager.DIFFICULTY_LEVELS[difficulty_number]
@@ -185,8 +185,7 @@ def display_results(subject, difficulty_level, name):
     
     # Display leaderboard
     st.header(f"Leaderboard - {subject} ({level_name})")
-    data = db_manager.load_data()
-    leaderboard = data["leaderboard"][subject].get(level_name, [])
+    leaderboard = db_manager.get_leaderboard(subject, level_name)
     
     if leaderboard:
         # Create a formatted table